@@ -5,7 +5,15 @@ This tool displays the combinations of possible passwords
 that a random password generator can create, taking into
 account password rules (eg. requiring one of each class).
 
-Pipe the output of this program into dot"""
+Pipe the output of this program into dot
+
+With --count, no graph is built: the number of valid passwords is
+counted class by class, which works for any number of character
+classes, long passwords and policies such as "3 of 4 classes" or
+minimum/maximum counts per class."""
+
+import argparse
+import math
 
 # 26 uppers, 26 lowers, 10 numbers, 32 symbols
 PROBS = [ 26, 26, 10, 32 ]
@@ -88,11 +96,115 @@ def gen(node, length=PW_LENGTH, flags=0):
 	if len(node.children) == 0:
 		raise Invalid()
 
+def parse_class(spec):
+	"""Parse a class spec of the form SIZE[:MIN[:MAX]] into a (size, min, max) tuple"""
+	parts = spec.split(":")
+	if len(parts) > 3:
+		raise argparse.ArgumentTypeError("Too many fields in class spec: " + spec)
+	try:
+		size = int(parts[0])
+		minimum = int(parts[1]) if len(parts) > 1 and parts[1] != "" else 0
+		maximum = int(parts[2]) if len(parts) > 2 and parts[2] != "" else None
+	except ValueError:
+		raise argparse.ArgumentTypeError("Invalid class spec: " + spec)
+	if size < 1:
+		raise argparse.ArgumentTypeError("Class size must be at least 1: " + spec)
+	if minimum < 0:
+		raise argparse.ArgumentTypeError("Class minimum must not be negative: " + spec)
+	if maximum is not None and maximum < minimum:
+		raise argparse.ArgumentTypeError("Class maximum must not be less than its minimum: " + spec)
+	return (size, minimum, maximum)
+
+def count(classes, length, min_classes=0, weighted=None):
+	"""Count the passwords of the given length allowed by a policy.
+
+	classes is a list of (size, min, max) tuples - max may be None for
+	no limit.  At least min_classes classes must appear in the password.
+
+	Classes are added one at a time, keeping a table indexed by
+	(positions filled, classes used) - there's no per-password state, so
+	this takes O(len(classes)^2 * length^2) time and O(len(classes) * length)
+	memory.
+
+	If weighted is a class index, each password is counted once per
+	occurrence of that class instead (used by position_distribution)."""
+	# table[used][present] = number of ways to fill "used" positions
+	table = [ [ 0 ] * (len(classes) + 1) for _ in range(length + 1) ]
+	table[0][0] = 1
+
+	for i, (size, minimum, maximum) in enumerate(classes):
+		if maximum is None or maximum > length:
+			maximum = length
+		new = [ [ 0 ] * (len(classes) + 1) for _ in range(length + 1) ]
+		for used in range(length + 1):
+			for present in range(i + 1):
+				ways = table[used][present]
+				if ways == 0:
+					continue
+				for k in range(minimum, min(maximum, length - used) + 1):
+					n = ways * math.comb(used + k, k) * size ** k
+					if weighted == i:
+						n *= k
+					new[used + k][present + (k > 0)] += n
+		table = new
+
+	return sum(table[length][min_classes:])
+
+def position_distribution(classes, length, min_classes=0):
+	"""Return how many valid passwords have each class at any given position.
+
+	Password rules don't depend on position, so this is the same for
+	every position in the password.
+
+	This runs count once per class, so it costs len(classes) times as
+	much as the total - still well under a second for 8 classes and
+	64 characters."""
+	if length == 0:
+		return [ 0 ] * len(classes)
+	return [ count(classes, length, min_classes, weighted=i) // length for i in range(len(classes)) ]
+
 if __name__ == "__main__":
 	import sys
 
-	rootNode = RootNode()
-	gen(rootNode)
-	print(rootNode.get_permutations(), file=sys.stderr)
-	rootNode.print_graph()
+	parser = argparse.ArgumentParser(description="Graph or count possible password combinations")
+	parser.add_argument("--count",
+			action="store_true",
+			help="Count passwords without building the graph")
+	parser.add_argument("--length",
+			type=int,
+			help="Password length (default: %d)" % PW_LENGTH,
+			default=PW_LENGTH)
+	parser.add_argument("--class",
+			dest="classes",
+			action="append",
+			type=parse_class,
+			help="Character class as SIZE[:MIN[:MAX]] (repeatable, implies --count)")
+	parser.add_argument("--min-classes",
+			type=int,
+			help="Minimum number of classes that must appear (implies --count)")
+	args = parser.parse_args()
+
+	if args.length < 0:
+		parser.error("--length must not be negative")
+
+	if args.count or args.classes is not None or args.min_classes is not None:
+		if args.classes is None:
+			args.classes = [ (p, 1 if ENFORCE_RULES else 0, None) for p in PROBS ]
+		if args.min_classes is None:
+			args.min_classes = 0
+		if not 0 <= args.min_classes <= len(args.classes):
+			parser.error("--min-classes must be between 0 and the number of classes (%d)" % len(args.classes))
+		total = count(args.classes, args.length, args.min_classes)
+		print(total)
+		if total > 0:
+			for (size, minimum, maximum), n in zip(args.classes, position_distribution(args.classes, args.length, args.min_classes)):
+				print("class size=%d min=%d max=%s: %.6f per position" % (size, minimum, "unlimited" if maximum is None else maximum, n / total), file=sys.stderr)
+	else:
+		rootNode = RootNode()
+		try:
+			gen(rootNode, args.length)
+		except Invalid:
+			pass # No password of this length satisfies the rules
+		print(rootNode.get_permutations(), file=sys.stderr)
+		rootNode.print_graph()
 